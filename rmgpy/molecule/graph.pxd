@@ -159,3 +159,5 @@ cdef class Graph(object):
     cpdef bint is_mapping_valid(self, Graph other, dict mapping, bint equivalent=?, bint strict=?) except -2
 
     cpdef list get_edges_in_cycle(self, list vertices, bint sort=?)
+
+cpdef copy_connectivity_values(Graph source, Graph target)
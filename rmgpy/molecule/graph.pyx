@@ -35,6 +35,7 @@ are the components of a graph.
 
 import itertools
 
+cimport cython
 import py_rdl
 
 from rmgpy.molecule.vf2 cimport VF2
@@ -140,6 +141,33 @@ cpdef short get_vertex_sorting_label(Vertex vertex) except -1:
     """
     return vertex.sorting_label
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef copy_connectivity_values(Graph source, Graph target):
+    """
+    Copy the connectivity values and sorting labels of the vertices in `source`
+    to the vertices in `target`. Vertices are matched by position, so `target`
+    must list its vertices in the same order as `source`, as is the case for a
+    deep copy made using :meth:`Graph.copy`.
+    """
+    cdef list vertices1, vertices2
+    cdef Vertex vertex1, vertex2
+    cdef Py_ssize_t i, n
+
+    vertices1 = source.vertices
+    vertices2 = target.vertices
+    n = len(vertices1)
+    if len(vertices2) != n:
+        raise ValueError('Cannot copy connectivity values between graphs with {0} and {1} vertices.'.format(
+            n, len(vertices2)))
+    for i in range(n):
+        vertex1 = vertices1[i]
+        vertex2 = vertices2[i]
+        vertex2.connectivity1 = vertex1.connectivity1
+        vertex2.connectivity2 = vertex1.connectivity2
+        vertex2.connectivity3 = vertex1.connectivity3
+        vertex2.sorting_label = vertex1.sorting_label
+
 ################################################################################
 
 cdef class Edge(object):
@@ -320,29 +348,40 @@ cdef class Graph(object):
         cdef Graph other
         cdef Vertex vertex, vertex1, vertex2
         cdef Edge edge
-        cdef dict edges, mapping
-        cdef list vertices
+        cdef dict edges, indices
+        cdef list vertices, new_vertices
         cdef int index1, index2
 
         other = Graph()
         vertices = self.vertices
-        mapping = {}
-        for vertex in vertices:
-            if deep:
-                vertex2 = other.add_vertex(vertex.copy())
-                mapping[vertex] = vertex2
-            else:
+        if deep:
+            # Vertices are matched by position, using their ids since vertex subclasses may define
+            # a hash that is shared by many vertices
+            indices = {}
+            for index1 in range(len(vertices)):
+                vertex = vertices[index1]
+                indices[id(vertex)] = index1
+                other.add_vertex(vertex.copy())
+            new_vertices = other.vertices
+            for index1 in range(len(vertices)):
+                vertex = vertices[index1]
+                for vertex2, edge in vertex.edges.items():
+                    index2 = indices[id(vertex2)]
+                    # Copy each edge once, when it is first encountered; the copy points from the
+                    # later vertex to the earlier one, which is the orientation deep copies have always had
+                    if index1 < index2:
+                        edge = edge.copy()
+                        vertex1 = new_vertices[index1]
+                        vertex2 = new_vertices[index2]
+                        edge.vertex1 = vertex2
+                        edge.vertex2 = vertex1
+                        vertex1.edges[vertex2] = edge
+                        vertex2.edges[vertex1] = edge
+        else:
+            for vertex in vertices:
                 edges = vertex.edges
                 other.add_vertex(vertex)
                 vertex.edges = edges
-        if deep:
-            for vertex1 in vertices:
-                for vertex2 in vertex1.edges:
-                    edge = vertex1.edges[vertex2]
-                    edge = edge.copy()
-                    edge.vertex1 = mapping[vertex1]
-                    edge.vertex2 = mapping[vertex2]
-                    other.add_edge(edge)
         return other
 
     cpdef dict copy_and_map(self):
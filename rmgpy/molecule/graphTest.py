@@ -29,7 +29,7 @@
 
 import unittest
 
-from rmgpy.molecule.graph import Edge, Graph, Vertex
+from rmgpy.molecule.graph import Edge, Graph, Vertex, copy_connectivity_values
 
 ################################################################################
 
@@ -210,6 +210,25 @@ class TestGraph(unittest.TestCase):
         self.assertTrue(graph2.is_isomorphic(graph))
         self.assertTrue(graph.is_isomorphic(graph2))
 
+    def test_deep_copy(self):
+        """
+        Test that a deep copy of the graph has new vertices and edges in the same positions.
+        """
+        graph2 = self.graph.copy(deep=True)
+        self.assertEqual(len(graph2.vertices), len(self.graph.vertices))
+        for v1, v2 in zip(self.graph.vertices, graph2.vertices):
+            self.assertIsNot(v1, v2)
+            self.assertEqual(len(v1.edges), len(v2.edges))
+        for index1, vertex1 in enumerate(self.graph.vertices):
+            for vertex2, edge in vertex1.edges.items():
+                index2 = self.graph.vertices.index(vertex2)
+                edge2 = graph2.get_edge(graph2.vertices[index1], graph2.vertices[index2])
+                self.assertIsNot(edge, edge2)
+                self.assertIs(edge2, graph2.get_edge(graph2.vertices[index2], graph2.vertices[index1]))
+                self.assertIs(edge2.vertex1, graph2.vertices[max(index1, index2)])
+                self.assertIs(edge2.vertex2, graph2.vertices[min(index1, index2)])
+        self.assertTrue(graph2.is_isomorphic(self.graph))
+
     def test_copy_and_map(self):
         """
         Test the returned dictionary points toward equivaalent vertices and edges
@@ -242,6 +261,27 @@ class TestGraph(unittest.TestCase):
         self.assertTrue(graph2.is_isomorphic(graph))
         self.assertTrue(graph.is_isomorphic(graph2))
 
+    def test_copy_connectivity_values(self):
+        """
+        Test that connectivity values and sorting labels are copied onto a deep copy of the graph.
+        """
+        self.graph.update_connectivity_values()
+        for index, vertex in enumerate(self.graph.vertices):
+            vertex.sorting_label = index
+
+        graph2 = self.graph.copy(deep=True)
+        copy_connectivity_values(self.graph, graph2)
+        for v1, v2 in zip(self.graph.vertices, graph2.vertices):
+            self.assertIsNot(v1, v2)
+            self.assertEqual(v1.connectivity1, v2.connectivity1)
+            self.assertEqual(v1.connectivity2, v2.connectivity2)
+            self.assertEqual(v1.connectivity3, v2.connectivity3)
+            self.assertEqual(v1.sorting_label, v2.sorting_label)
+
+        graph2.remove_vertex(graph2.vertices[-1])
+        with self.assertRaises(ValueError):
+            copy_connectivity_values(self.graph, graph2)
+
     def test_split(self):
         """
         Test the graph split function to ensure a proper splitting of the graph
@@ -60,6 +60,8 @@ cdef class Atom(Vertex):
 
     cpdef bint is_carbon(self)
 
+    cpdef bint is_nitrogen(self)
+
     cpdef bint is_oxygen(self)
 
     cpdef bint is_fluorine(self)
@@ -143,6 +145,7 @@ cdef class Molecule(Graph):
     cdef str _fingerprint
     cdef str _inchi
     cdef str _smiles
+    cdef tuple _aromatic_rings_cache
 
     cpdef add_atom(self, Atom atom)
 
@@ -237,10 +240,12 @@ cdef class Molecule(Graph):
 
     cpdef double calculate_cpinf(self) except -1
     
-    cpdef update_atomtypes(self, bint log_species=?, bint raise_exception=?)
+    cpdef update_atomtypes(self, bint log_species=?, bint raise_exception=?, list atoms=?)
     
     cpdef bint is_radical(self) except -2
 
+    cpdef list get_radical_atoms(self)
+
     cpdef bint has_lone_pairs(self) except -2
 
     cpdef bint is_aryl_radical(self, list aromatic_rings=?) except -2
@@ -255,6 +260,10 @@ cdef class Molecule(Graph):
 
     cpdef tuple get_aromatic_rings(self, list rings=?)
 
+    cpdef tuple _get_state_key(self)
+
+    cpdef tuple _perceive_aromatic_rings(self, list rings=?)
+
     cpdef list get_deterministic_sssr(self)
 
     cpdef kekulize(self)
@@ -55,7 +55,7 @@ from rmgpy.exceptions import DependencyError
 from rmgpy.molecule.adjlist import Saturator
 from rmgpy.molecule.atomtype import AtomType, ATOMTYPES, get_atomtype, AtomTypeError
 from rmgpy.molecule.element import bdes
-from rmgpy.molecule.graph import Vertex, Edge, Graph, get_vertex_connectivity_value
+from rmgpy.molecule.graph import Vertex, Edge, Graph, copy_connectivity_values, get_vertex_connectivity_value
 from rmgpy.molecule.kekulize import kekulize
 from rmgpy.molecule.pathfinder import find_shortest_path
 
@@ -318,7 +318,7 @@ class Atom(Vertex):
         a.lone_pairs = self.lone_pairs
         a.coords = self.coords[:]
         a.id = self.id
-        a.props = deepcopy(self.props)
+        a.props = deepcopy(self.props) if self.props else {}
         return a
 
     def is_hydrogen(self):
@@ -890,6 +890,7 @@ class Molecule(Graph):
         self._fingerprint = None
         self._inchi = None
         self._smiles = None
+        self._aromatic_rings_cache = None
         self.props = props or {}
 
         if inchi and smiles:
@@ -1234,17 +1235,12 @@ class Molecule(Graph):
         If `deep` is ``False`` or not specified, a shallow copy is made: the
         original vertices and edges are used in the new graph.
         """
-        cython.declare(g=Graph, other=Molecule, i=int, v1=Vertex, v2=Vertex)
+        cython.declare(g=Graph, other=Molecule)
         g = Graph.copy(self, deep)
         other = Molecule(g.vertices)
-        # Copy connectivity values and sorting labels
-        for i in range(len(self.vertices)):
-            v1 = self.vertices[i]
-            v2 = other.vertices[i]
-            v2.connectivity1 = v1.connectivity1
-            v2.connectivity2 = v1.connectivity2
-            v2.connectivity3 = v1.connectivity3
-            v2.sorting_label = v1.sorting_label
+        if deep:
+            # Copy connectivity values and sorting labels (a shallow copy shares the original atoms)
+            copy_connectivity_values(self, other)
         other.multiplicity = self.multiplicity
         other.reactive = self.reactive
         return other
@@ -1338,7 +1334,7 @@ class Molecule(Graph):
                     self.add_bond(bond)
         self.update_atomtypes(raise_exception=raise_atomtype_exception)
 
-    def update_atomtypes(self, log_species=True, raise_exception=True):
+    def update_atomtypes(self, log_species=True, raise_exception=True, atoms=None):
         """
         Iterate through the atoms in the structure, checking their atom types
         to ensure they are correct (i.e. accurately describe their local bond
@@ -1347,12 +1343,17 @@ class Molecule(Graph):
         If `raise_exception` is `False`, then the generic atomtype 'R' will
         be prescribed to any atom when get_atomtype fails. Currently used for
         resonance hybrid atom types.
+
+        If a list of `atoms` is given, only those atoms are updated. This is
+        useful when only the bonds around a few atoms have been changed.
         """
+        if atoms is None:
+            atoms = self.vertices
         # Because we use lonepairs to match atomtypes and default is -100 when unspecified,
         # we should update before getting the atomtype.
-        self.update_lone_pairs()
+        self.update_lone_pairs(atoms)
 
-        for atom in self.vertices:
+        for atom in atoms:
             try:
                 atom.atomtype = get_atomtype(atom, atom.edges)
             except AtomTypeError:
@@ -2131,13 +2132,16 @@ class Molecule(Graph):
                 radical_atoms_list.append(atom)
         return radical_atoms_list
 
-    def update_lone_pairs(self):
+    def update_lone_pairs(self, atoms=None):
         """
         Iterate through the atoms in the structure and calculate the
         number of lone electron pairs, assuming a neutral molecule.
+        If a list of `atoms` is given, only those atoms are updated.
         """
         cython.declare(atom1=Atom, atom2=Atom, bond12=Bond, order=float)
-        for atom1 in self.vertices:
+        if atoms is None:
+            atoms = self.vertices
+        for atom1 in atoms:
             if atom1.is_hydrogen() or atom1.is_surface_site():
                 atom1.lone_pairs = 0
             else:
@@ -2273,6 +2277,41 @@ class Molecule(Graph):
 
         The method currently restricts aromaticity to six-membered carbon-only rings. This is a limitation imposed
         by RMG, and not by RDKit.
+
+        If `rings` is not provided, the result is cached and reused for as long as the atoms, bonds and electronic
+        state of the molecule are unchanged, since ring and aromaticity perception are expensive.
+        """
+        cython.declare(key=tuple)
+
+        if rings is not None:
+            return self._perceive_aromatic_rings(rings)
+
+        key = self._get_state_key()
+        if self._aromatic_rings_cache is None or self._aromatic_rings_cache[0] != key:
+            self._aromatic_rings_cache = (key,) + self._perceive_aromatic_rings()
+        # Return new outer lists, since callers are free to reorder them
+        return list(self._aromatic_rings_cache[1]), list(self._aromatic_rings_cache[2])
+
+    def _get_state_key(self):
+        """
+        Return a tuple which fully describes the atoms, bonds and electronic state of the molecule.
+        Used to check whether cached structural information is still valid.
+
+        The key does not depend on the order of the atoms, since this is changed by sorting them,
+        e.g. during aromaticity perception.
+        """
+        cython.declare(key=list, atom=Atom, atom2=Atom, bond=Bond)
+        key = []
+        for atom in self.vertices:
+            key.append((id(atom), atom.element.number, atom.radical_electrons, atom.lone_pairs, atom.charge))
+            for atom2, bond in atom.edges.items():
+                key.append((id(atom), id(atom2), id(bond), bond.order))
+        key.sort()
+        return tuple(key)
+
+    def _perceive_aromatic_rings(self, rings=None):
+        """
+        Perceive the aromatic rings without using the cache. See :meth:`get_aromatic_rings`.
         """
         cython.declare(rd_atom_indices=dict, ob_atom_ids=dict, aromatic_rings=list, aromatic_bonds=list)
         cython.declare(ring0=list, i=cython.int, atom1=Atom, atom2=Atom)
@@ -1915,6 +1915,28 @@ multiplicity 2
             lp += atom.lone_pairs
         self.assertEqual(lp, 1)
 
+    def test_update_atomtypes_of_selected_atoms(self):
+        """Test that update_atomtypes only updates the atoms it is given."""
+        mol = Molecule().from_adjacency_list("""
+1 C u0 p0 c0 {2,D} {4,S} {5,S}
+2 C u0 p0 c0 {1,D} {3,S} {6,S}
+3 C u0 p0 c0 {2,S} {7,S} {8,S} {9,S}
+4 H u0 p0 c0 {1,S}
+5 H u0 p0 c0 {1,S}
+6 H u0 p0 c0 {2,S}
+7 H u0 p0 c0 {3,S}
+8 H u0 p0 c0 {3,S}
+9 H u0 p0 c0 {3,S}
+""")
+        atom1, atom2, atom3 = mol.atoms[:3]
+        mol.get_bond(atom1, atom2).decrement_order()
+        atom1.increment_radical()
+        atom2.increment_radical()
+        mol.update_atomtypes(atoms=[atom1])
+        self.assertEqual(atom1.atomtype.label, 'Cs')
+        self.assertEqual(atom2.atomtype.label, 'Cd')
+        self.assertEqual(atom3.atomtype.label, 'Cs')
+
     def test_large_mol_update(self):
         adjlist = """
 1  C u0 p0 c0 {7,S} {33,S} {34,S} {35,S}
@@ -2427,6 +2449,29 @@ multiplicity 2
         self.assertEqual(len(aromatic_atoms), 0)
         self.assertEqual(len(aromatic_bonds), 0)
 
+    def test_aromaticity_perception_cache(self):
+        """Test that cached aromaticity perception is invalidated when the bonding changes."""
+        mol = Molecule(smiles='c1ccccc1')
+        aromatic_atoms, aromatic_bonds = mol.get_aromatic_rings()
+        self.assertEqual(len(aromatic_bonds), 1)
+        # Repeated calls should give the same result in a new list
+        aromatic_atoms2, aromatic_bonds2 = mol.get_aromatic_rings()
+        self.assertEqual(aromatic_bonds, aromatic_bonds2)
+        self.assertIsNot(aromatic_bonds, aromatic_bonds2)
+        # Reordering the atoms, as done when sorting them, should not invalidate the cache
+        key = mol._get_state_key()
+        mol.vertices.reverse()
+        self.assertEqual(mol._get_state_key(), key)
+        # Saturating one of the double bonds should remove the aromatic ring
+        for bond in aromatic_bonds[0]:
+            if bond.is_double():
+                bond.decrement_order()
+                bond.atom1.increment_radical()
+                bond.atom2.increment_radical()
+                break
+        aromatic_atoms, aromatic_bonds = mol.get_aromatic_rings()
+        self.assertEqual(len(aromatic_bonds), 0)
+
     def test_aryl_radical_true(self):
         """Test aryl radical perception for phenyl radical."""
         mol = Molecule(smiles='[c]1ccccc1')
@@ -36,17 +36,21 @@ cpdef list generate_resonance_structures(Molecule mol, bint clar_structures=?, b
 
 cpdef list _generate_resonance_structures(list mol_list, list method_list, bint keep_isomorphic=?, bint copy=?, bint filter_structures=?)
 
-cpdef list generate_allyl_delocalization_resonance_structures(Molecule mol)
+cpdef tuple _get_isomorphism_key(Molecule mol)
 
-cpdef list generate_lone_pair_multiple_bond_resonance_structures(Molecule mol)
+cpdef Molecule _copy_resonance_structure(Molecule mol, list atoms, dict buckets=?)
 
-cpdef list generate_adj_lone_pair_radical_resonance_structures(Molecule mol)
+cpdef list generate_allyl_delocalization_resonance_structures(Molecule mol, dict buckets=?)
 
-cpdef list generate_adj_lone_pair_multiple_bond_resonance_structures(Molecule mol)
+cpdef list generate_lone_pair_multiple_bond_resonance_structures(Molecule mol, dict buckets=?)
 
-cpdef list generate_adj_lone_pair_radical_multiple_bond_resonance_structures(Molecule mol)
+cpdef list generate_adj_lone_pair_radical_resonance_structures(Molecule mol, dict buckets=?)
 
-cpdef list generate_N5dc_radical_resonance_structures(Molecule mol)
+cpdef list generate_adj_lone_pair_multiple_bond_resonance_structures(Molecule mol, dict buckets=?)
+
+cpdef list generate_adj_lone_pair_radical_multiple_bond_resonance_structures(Molecule mol, dict buckets=?)
+
+cpdef list generate_N5dc_radical_resonance_structures(Molecule mol, dict buckets=?)
 
 cpdef list generate_isomorphic_resonance_structures(Molecule mol, bint saturate_h=?)
 
@@ -56,10 +60,22 @@ cpdef list generate_aromatic_resonance_structure(Molecule mol, list aromatic_bon
 
 cpdef list generate_aryne_resonance_structures(Molecule mol)
 
+cpdef tuple _match_aryne_pattern(list bond_list)
+
+cpdef bint _has_aryne_pattern(Molecule mol)
+
 cpdef list generate_kekule_structure(Molecule mol)
 
 cpdef list generate_clar_structures(Molecule mol)
 
+cpdef _get_clar_connectivity_matrix(list atoms, list aromatic_rings, list bonds)
+
+cpdef _build_clar_lp(list atoms, list aromatic_rings, list bonds, list exo)
+
+cpdef tuple _solve_clar_milp(a, list exo, list constraints)
+
 cpdef list _clar_optimization(Molecule mol, list constraints=?, max_num=?)
 
+cpdef tuple _copy_clar_solution(Molecule mol, dict indices, list aromatic_rings, list bonds, list solution)
+
 cpdef list _clar_transformation(Molecule mol, list aromatic_ring)
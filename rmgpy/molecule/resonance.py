@@ -52,17 +52,29 @@ Currently supported resonance types:
 """
 
 import logging
+from collections import deque
 
 import cython
+import numpy as np
 
 import rmgpy.molecule.filtration as filtration
 import rmgpy.molecule.pathfinder as pathfinder
 from rmgpy.exceptions import ILPSolutionError, KekulizationError, AtomTypeError, ResonanceError
 from rmgpy.molecule.adjlist import Saturator
-from rmgpy.molecule.graph import Vertex
+from rmgpy.molecule.atomtype import get_atomtype
 from rmgpy.molecule.kekulize import kekulize
 from rmgpy.molecule.molecule import Atom, Bond, Molecule
 
+try:
+    from scipy.optimize import milp
+except ImportError:
+    # scipy.optimize.milp is only available in SciPy 1.9 or later, otherwise lpsolve is used for Clar structures
+    milp = None
+
+
+# Resonance algorithms for each combination of molecule features, see populate_resonance_algorithms
+_resonance_algorithms = {}
+
 
 def populate_resonance_algorithms(features=None):
     """
@@ -71,7 +83,7 @@ def populate_resonance_algorithms(features=None):
     Takes a dictionary of features generated by analyze_molecule().
     Returns a list of resonance algorithms.
     """
-    cython.declare(method_list=list)
+    cython.declare(method_list=list, key=tuple)
     method_list = []
 
     if features is None:
@@ -88,6 +100,12 @@ def populate_resonance_algorithms(features=None):
             generate_clar_structures,
         ]
     else:
+        # The list only depends on these features, so it is only built once for each combination of them
+        key = (bool(features['is_radical']), bool(features['is_aromatic']), bool(features['is_aryl_radical']),
+               bool(features['is_cyclic']), bool(features['hasNitrogenVal5']), bool(features['hasLonePairs']))
+        if key in _resonance_algorithms:
+            return list(_resonance_algorithms[key])
+
         # If the molecule is aromatic, then radical resonance has already been considered
         # If the molecule was falsely identified as aromatic, then is_aryl_radical will still accurately capture
         # cases where the radical is in an orbital that is orthogonal to the pi orbitals.
@@ -95,12 +113,16 @@ def populate_resonance_algorithms(features=None):
             method_list.append(generate_allyl_delocalization_resonance_structures)
         if features['is_cyclic']:
             method_list.append(generate_aryne_resonance_structures)
-        if features['hasNitrogenVal5']:
+        # The number of radical electrons is the same in every resonance structure, so methods which only
+        # shift radicals are left out for closed shell species instead of each checking for radicals on every call
+        if features['hasNitrogenVal5'] and features['is_radical']:
             method_list.append(generate_N5dc_radical_resonance_structures)
         if features['hasLonePairs']:
-            method_list.append(generate_adj_lone_pair_radical_resonance_structures)
+            if features['is_radical']:
+                method_list.append(generate_adj_lone_pair_radical_resonance_structures)
             method_list.append(generate_adj_lone_pair_multiple_bond_resonance_structures)
-            method_list.append(generate_adj_lone_pair_radical_multiple_bond_resonance_structures)
+            if features['is_radical']:
+                method_list.append(generate_adj_lone_pair_radical_multiple_bond_resonance_structures)
             if not features['is_aromatic']:
                 # The generate_lone_pair_multiple_bond_resonance_structures method may purturb the electronic
                 # configuration of a conjugated aromatic system, causing a major slow-down (two orders of magnitude
@@ -110,6 +132,8 @@ def populate_resonance_algorithms(features=None):
                 # and pass a list of forbidden atom ID's to find_lone_pair_multiple_bond_paths.
                 method_list.append(generate_lone_pair_multiple_bond_resonance_structures)
 
+        _resonance_algorithms[key] = tuple(method_list)
+
     return method_list
 
 
@@ -119,7 +143,7 @@ def analyze_molecule(mol):
 
     Returns a dictionary of features.
     """
-    cython.declare(features=dict)
+    cython.declare(features=dict, atom=Atom, has_nitrogen_val5=cython.bint, has_lone_pairs=cython.bint)
 
     features = {'is_radical': mol.is_radical(),
                 'is_cyclic': mol.is_cyclic(),
@@ -138,11 +162,16 @@ def analyze_molecule(mol):
             features['isPolycyclicAromatic'] = True
         if features['is_radical'] and features['is_aromatic']:
             features['is_aryl_radical'] = mol.is_aryl_radical(aromatic_rings)
+    has_nitrogen_val5 = has_lone_pairs = False
     for atom in mol.vertices:
-        if atom.is_nitrogen() and atom.lone_pairs == 0:
-            features['hasNitrogenVal5'] = True
         if atom.lone_pairs > 0:
-            features['hasLonePairs'] = True
+            has_lone_pairs = True
+        elif atom.lone_pairs == 0 and atom.element.number == 7:
+            has_nitrogen_val5 = True
+        if has_lone_pairs and has_nitrogen_val5:
+            break
+    features['hasNitrogenVal5'] = has_nitrogen_val5
+    features['hasLonePairs'] = has_lone_pairs
 
     return features
 
@@ -170,7 +199,7 @@ def generate_resonance_structures(mol, clar_structures=True, keep_isomorphic=Fal
     - Stable polycyclic aromatic species: Clar structures are generated
     - Stable monocyclic aromatic species: Kekule structures are generated
     """
-    cython.declare(mol_list=list, new_mol_list=list, features=dict, method_list=list)
+    cython.declare(mol_list=list, new_mol_list=list, features=dict, method_list=list, key=tuple)
 
     # Check that mol is a valid structure in terms of atomTypes and net charge. Since SMILES with hypervalance
     # heteroatoms are not always read correctly, print a suggestion to input the structure using an adjList.
@@ -207,9 +236,12 @@ def generate_resonance_structures(mol, clar_structures=True, keep_isomorphic=Fal
             features['is_aromatic'] = True
             if len(new_mol_list[0].get_aromatic_rings()[0]) > 1:
                 features['isPolycyclicAromatic'] = True
+            key = _get_isomorphism_key(mol)
             for new_mol in new_mol_list:
                 # Append to structure list if unique
-                if not keep_isomorphic and mol.is_isomorphic(new_mol):
+                if key != _get_isomorphism_key(new_mol):
+                    mol_list.append(new_mol)
+                elif not keep_isomorphic and mol.is_isomorphic(new_mol):
                     continue
                 elif keep_isomorphic and mol.is_identical(new_mol):
                     continue
@@ -253,12 +285,23 @@ def _generate_resonance_structures(mol_list, method_list, keep_isomorphic=False,
         copy                if False, append new resonance structures to input list (default)
                             if True, make a new list with all of the resonance structures
     """
-    cython.declare(index=cython.int, molecule=Molecule, new_mol_list=list, new_mol=Molecule, mol=Molecule)
+    cython.declare(index=cython.int, molecule=Molecule, new_mol_list=list, new_mol=Molecule, mol=Molecule,
+                   buckets=dict, bucket=list, others=list, added=dict, checked=set, key=tuple, molecule_key=tuple,
+                   methods=list, takes_buckets=cython.bint)
 
     if copy:
         # Make a copy of the list so we don't modify the input list
         mol_list = mol_list[:]
 
+    # Decide once which methods are given the known structures, so that each of them is called directly
+    methods = [(method, not keep_isomorphic and method in _bucket_resonance_algorithms) for method in method_list]
+
+    # Group structures by a cheap graph invariant, so that each new structure
+    # only needs to be checked for isomorphism against structures with the same key
+    buckets = {}
+    for mol in mol_list:
+        buckets.setdefault(_get_isomorphism_key(mol), []).append(mol)
+
     min_octet_deviation = min(filtration.get_octet_deviation_list(mol_list))
     min_charge_span = min(filtration.get_charge_span_list(mol_list))
 
@@ -267,6 +310,7 @@ def _generate_resonance_structures(mol_list, method_list, keep_isomorphic=False,
     while index < len(mol_list):
         molecule = mol_list[index]
         new_mol_list = []
+        checked = set()
 
         # On-the-fly filtration: Extend methods only for molecule that don't deviate too much from the octet rule
         # (a +2 distance from the minimal deviation is used, octet deviations per species are in increments of 2)
@@ -276,8 +320,13 @@ def _generate_resonance_structures(mol_list, method_list, keep_isomorphic=False,
         octet_deviation = filtration.get_octet_deviation(molecule)
         charge_span = molecule.get_charge_span()
         if octet_deviation <= min_octet_deviation + 2 and charge_span <= min_charge_span + 1:
-            for method in method_list:
-                new_mol_list.extend(method(molecule))
+            for method, takes_buckets in methods:
+                if takes_buckets:
+                    for new_mol in method(molecule, buckets):
+                        new_mol_list.append(new_mol)
+                        checked.add(id(new_mol))
+                else:
+                    new_mol_list.extend(method(molecule))
             if octet_deviation < min_octet_deviation:
                 # update min_octet_deviation to make this criterion tighter
                 min_octet_deviation = octet_deviation
@@ -285,15 +334,29 @@ def _generate_resonance_structures(mol_list, method_list, keep_isomorphic=False,
                 # update min_charge_span to make this criterion tighter
                 min_charge_span = charge_span
 
+        # Structures in `checked` were already compared to the known structures other than `molecule` when they
+        # were generated, so they only need to be compared to `molecule` and to the structures added below
+        molecule_key = _get_isomorphism_key(molecule) if checked else None
+        added = {}
         for new_mol in new_mol_list:
             # Append to structure list if unique
-            for mol in mol_list:
+            key = _get_isomorphism_key(new_mol)
+            bucket = buckets.setdefault(key, [])
+            if id(new_mol) in checked:
+                others = added.get(key, [])
+                if key == molecule_key:
+                    others = [molecule] + others
+            else:
+                others = bucket
+            for mol in others:
                 if not keep_isomorphic and mol.is_isomorphic(new_mol):
                     break
                 elif keep_isomorphic and mol.is_identical(new_mol):
                     break
             else:
                 mol_list.append(new_mol)
+                bucket.append(new_mol)
+                added.setdefault(key, []).append(new_mol)
 
         # Move to the next resonance structure
         index += 1
@@ -308,51 +371,118 @@ def _generate_resonance_structures(mol_list, method_list, keep_isomorphic=False,
     return mol_list
 
 
-def generate_allyl_delocalization_resonance_structures(mol):
+def _get_isomorphism_key(mol):
+    """
+    Return a hashable invariant of the molecule which is identical for all isomorphic structures.
+
+    Structures with different keys cannot be isomorphic (or identical), so the key can be used to avoid
+    most of the expensive isomorphism checks when removing duplicate resonance structures.
+    Matching keys do not guarantee that two structures are isomorphic.
+    """
+    cython.declare(atoms=list, bonds=list, atom1=Atom, atom2=Atom, bond=Bond, number=cython.int)
+
+    atoms = []
+    bonds = []
+    for atom1 in mol.vertices:
+        number = atom1.element.number
+        atoms.append((number, atom1.radical_electrons, atom1.lone_pairs, atom1.charge, len(atom1.edges)))
+        for atom2, bond in atom1.edges.items():
+            bonds.append((number, atom2.element.number, bond.order))
+    atoms.sort()
+    bonds.sort()
+
+    return mol.multiplicity, tuple(atoms), tuple(bonds)
+
+
+def _copy_resonance_structure(mol, atoms, buckets=None):
+    """
+    Return a deep copy of `mol` in its current state, in which the atom types of the changed `atoms` are updated,
+    or ``None`` if an atom type cannot be determined for any of them. The atom types of `mol` itself are unchanged.
+
+    Only the atoms involved in a resonance transformation can change atom type, so this avoids updating the
+    atom types of the whole copy.
+
+    If `buckets` of known structures grouped by :func:`_get_isomorphism_key` are given, ``None`` is also returned
+    if `mol` is isomorphic to any of them other than `mol` itself, so that no copy is made of a structure which
+    would be discarded.
+    """
+    cython.declare(atom=Atom, atomtypes=list, old_atomtypes=list, i=cython.int, structure=Molecule,
+                   bucket=list, vertices=list, other=Molecule, known=cython.bint)
+    atomtypes = []
+    for atom in atoms:
+        try:
+            atomtypes.append(get_atomtype(atom, atom.edges))
+        except AtomTypeError:
+            return None
+    old_atomtypes = []
+    for i in range(len(atoms)):
+        atom = atoms[i]
+        old_atomtypes.append(atom.atomtype)
+        atom.atomtype = atomtypes[i]
+
+    known = False
+    bucket = buckets.get(_get_isomorphism_key(mol)) if buckets is not None else None
+    if bucket:
+        # The isomorphism check may sort the vertices in place, so give it a list which the
+        # calling generator is not iterating over, and restore the original list afterwards
+        vertices = mol.vertices
+        mol.vertices = vertices[:]
+        try:
+            for other in bucket:
+                # `mol` itself may be among the known structures, but its original state cannot be compared
+                if other is not mol and other.is_isomorphic(mol):
+                    known = True
+                    break
+        finally:
+            mol.vertices = vertices
+    structure = None if known else mol.copy(deep=True)
+
+    for i in range(len(atoms)):
+        atom = atoms[i]
+        atom.atomtype = old_atomtypes[i]
+    return structure
+
+
+def generate_allyl_delocalization_resonance_structures(mol, buckets=None):
     """
     Generate all of the resonance structures formed by one allyl radical shift.
 
     Biradicals on a single atom are not supported.
+    Structures isomorphic to any in `buckets` are skipped, see :func:`_copy_resonance_structure`.
     """
-    cython.declare(structures=list, paths=list, index=cython.int, structure=Molecule)
+    cython.declare(structures=list, paths=list, structure=Molecule)
     cython.declare(atom=Atom, atom1=Atom, atom2=Atom, atom3=Atom, bond12=Bond, bond23=Bond)
-    cython.declare(v1=Vertex, v2=Vertex)
 
     structures = []
-    if mol.is_radical():  # Iterate over radicals in structure
-        for atom in mol.vertices:
-            paths = pathfinder.find_allyl_delocalization_paths(atom)
-            for atom1, atom2, atom3, bond12, bond23 in paths:
-                # Adjust to (potentially) new resonance structure
-                atom1.decrement_radical()
-                atom3.increment_radical()
-                bond12.increment_order()
-                bond23.decrement_order()
-                # Make a copy of structure
-                structure = mol.copy(deep=True)
-                # Restore current structure
-                atom1.increment_radical()
-                atom3.decrement_radical()
-                bond12.decrement_order()
-                bond23.increment_order()
-                try:
-                    structure.update_atomtypes(log_species=False)
-                except AtomTypeError:
-                    pass  # Don't append resonance structure if it creates an undefined atomtype
-                else:
-                    structures.append(structure)
+    for atom in mol.get_radical_atoms():  # Iterate over radicals in structure
+        paths = pathfinder.find_allyl_delocalization_paths(atom)
+        for atom1, atom2, atom3, bond12, bond23 in paths:
+            # Adjust to (potentially) new resonance structure
+            atom1.decrement_radical()
+            atom3.increment_radical()
+            bond12.increment_order()
+            bond23.decrement_order()
+            # Make a copy of structure, with the atom types of the changed atoms updated
+            structure = _copy_resonance_structure(mol, [atom1, atom2, atom3], buckets)
+            # Restore current structure
+            atom1.increment_radical()
+            atom3.decrement_radical()
+            bond12.decrement_order()
+            bond23.increment_order()
+            if structure is not None:  # Don't append resonance structure if it creates an undefined atomtype
+                structures.append(structure)
     return structures
 
 
-def generate_lone_pair_multiple_bond_resonance_structures(mol):
+def generate_lone_pair_multiple_bond_resonance_structures(mol, buckets=None):
     """
     Generate all of the resonance structures formed by lone electron pair - multiple bond shifts in 3-atom systems.
     Examples: aniline (Nc1ccccc1), azide, [:NH2]C=[::O] <=> [NH2+]=C[:::O-]
     (where ':' denotes a lone pair, '.' denotes a radical, '-' not in [] denotes a single bond, '-'/'+' denote charge)
+    Structures isomorphic to any in `buckets` are skipped, see :func:`_copy_resonance_structure`.
     """
-    cython.declare(structures=list, paths=list, index=cython.int, structure=Molecule)
+    cython.declare(structures=list, paths=list, structure=Molecule)
     cython.declare(atom=Atom, atom1=Atom, atom2=Atom, atom3=Atom, bond12=Bond, bond23=Bond)
-    cython.declare(v1=Vertex, v2=Vertex)
 
     structures = []
     for atom in mol.vertices:
@@ -360,117 +490,99 @@ def generate_lone_pair_multiple_bond_resonance_structures(mol):
             paths = pathfinder.find_lone_pair_multiple_bond_paths(atom)
             for atom1, atom2, atom3, bond12, bond23 in paths:
                 # Adjust to (potentially) new resonance structure
-                atom1.decrement_lone_pairs()
-                atom3.increment_lone_pairs()
+                # Bonds are changed first, so that changing the lone pairs also updates the charges
                 bond12.increment_order()
                 bond23.decrement_order()
-                atom1.update_charge()
-                atom3.update_charge()
-                # Make a copy of structure
-                structure = mol.copy(deep=True)
+                atom1.decrement_lone_pairs()
+                atom3.increment_lone_pairs()
+                # Make a copy of structure, with the atom types of the changed atoms updated
+                structure = _copy_resonance_structure(mol, [atom1, atom2, atom3], buckets)
                 # Restore current structure
-                atom1.increment_lone_pairs()
-                atom3.decrement_lone_pairs()
                 bond12.decrement_order()
                 bond23.increment_order()
-                atom1.update_charge()
-                atom3.update_charge()
-                try:
-                    structure.update_atomtypes(log_species=False)
-                except AtomTypeError:
-                    pass  # Don't append resonance structure if it creates an undefined atomtype
-                else:
+                atom1.increment_lone_pairs()
+                atom3.decrement_lone_pairs()
+                if structure is not None:  # Don't append resonance structure if it creates an undefined atomtype
                     structures.append(structure)
     return structures
 
 
-def generate_adj_lone_pair_radical_resonance_structures(mol):
+def generate_adj_lone_pair_radical_resonance_structures(mol, buckets=None):
     """
     Generate all of the resonance structures formed by lone electron pair - radical shifts between adjacent atoms.
     These resonance transformations do not involve changing bond orders.
     NO2 example: O=[:N]-[::O.] <=> O=[N.+]-[:::O-]
     (where ':' denotes a lone pair, '.' denotes a radical, '-' not in [] denotes a single bond, '-'/'+' denote charge)
+    Structures isomorphic to any in `buckets` are skipped, see :func:`_copy_resonance_structure`.
     """
-    cython.declare(structures=list, paths=list, index=cython.int, structure=Molecule)
+    cython.declare(structures=list, paths=list, structure=Molecule)
     cython.declare(atom=Atom, atom1=Atom, atom2=Atom)
-    cython.declare(v1=Vertex, v2=Vertex)
 
     structures = []
-    if mol.is_radical():  # Iterate over radicals in structure
-        for atom in mol.vertices:
-            paths = pathfinder.find_adj_lone_pair_radical_delocalization_paths(atom)
-            for atom1, atom2 in paths:
-                # Adjust to (potentially) new resonance structure
-                atom1.decrement_radical()
-                atom1.increment_lone_pairs()
-                atom1.update_charge()
-                atom2.increment_radical()
-                atom2.decrement_lone_pairs()
-                atom2.update_charge()
-                # Make a copy of structure
-                structure = mol.copy(deep=True)
-                # Restore current structure
-                atom1.increment_radical()
-                atom1.decrement_lone_pairs()
-                atom1.update_charge()
-                atom2.decrement_radical()
-                atom2.increment_lone_pairs()
-                atom2.update_charge()
-                try:
-                    structure.update_atomtypes(log_species=False)
-                except AtomTypeError:
-                    pass  # Don't append resonance structure if it creates an undefined atomtype
-                else:
-                    structures.append(structure)
+    for atom in mol.get_radical_atoms():  # Iterate over radicals in structure
+        paths = pathfinder.find_adj_lone_pair_radical_delocalization_paths(atom)
+        for atom1, atom2 in paths:
+            # Adjust to (potentially) new resonance structure
+            # Changing the lone pairs last also updates the charges
+            atom1.decrement_radical()
+            atom1.increment_lone_pairs()
+            atom2.increment_radical()
+            atom2.decrement_lone_pairs()
+            # Make a copy of structure, with the atom types of the changed atoms updated
+            structure = _copy_resonance_structure(mol, [atom1, atom2], buckets)
+            # Restore current structure
+            atom1.increment_radical()
+            atom1.decrement_lone_pairs()
+            atom2.decrement_radical()
+            atom2.increment_lone_pairs()
+            if structure is not None:  # Don't append resonance structure if it creates an undefined atomtype
+                structures.append(structure)
     return structures
 
 
-def generate_adj_lone_pair_multiple_bond_resonance_structures(mol):
+def generate_adj_lone_pair_multiple_bond_resonance_structures(mol, buckets=None):
     """
     Generate all of the resonance structures formed by lone electron pair - multiple bond shifts between adjacent atoms.
     Example: [:NH]=[CH2] <=> [::NH-]-[CH2+]
     (where ':' denotes a lone pair, '.' denotes a radical, '-' not in [] denotes a single bond, '-'/'+' denote charge)
     Here atom1 refers to the N/S/O atom, atom 2 refers to the any R!H (atom2's lone_pairs aren't affected)
     (In direction 1 atom1 <losses> a lone pair, in direction 2 atom1 <gains> a lone pair)
+    Structures isomorphic to any in `buckets` are skipped, see :func:`_copy_resonance_structure`.
     """
-    cython.declare(structures=list, paths=list, index=cython.int, structure=Molecule, direction=cython.int)
+    cython.declare(structures=list, paths=list, structure=Molecule, direction=cython.int)
     cython.declare(atom=Atom, atom1=Atom, atom2=Atom, bond12=Bond)
-    cython.declare(v1=Vertex, v2=Vertex)
 
     structures = []
     for atom in mol.vertices:
-        paths = pathfinder.find_adj_lone_pair_multiple_bond_delocalization_paths(atom)
-        for atom1, atom2, bond12, direction in paths:
-            if direction == 1:  # The direction <increasing> the bond order
-                atom1.decrement_lone_pairs()
-                bond12.increment_order()
-            elif direction == 2:  # The direction <decreasing> the bond order
-                atom1.increment_lone_pairs()
-                bond12.decrement_order()
-            atom1.update_charge()
-            atom2.update_charge()
-            # Make a copy of structure
-            structure = mol.copy(deep=True)
-            # Restore current structure
-            if direction == 1:  # The direction <increasing> the bond order
-                atom1.increment_lone_pairs()
-                bond12.decrement_order()
-            elif direction == 2:  # The direction <decreasing> the bond order
-                atom1.decrement_lone_pairs()
-                bond12.increment_order()
-            atom1.update_charge()
-            atom2.update_charge()
-            try:
-                structure.update_atomtypes(log_species=False)
-            except AtomTypeError:
-                pass  # Don't append resonance structure if it creates an undefined atomtype
-            else:
-                if not (structure.get_net_charge() and structure.contains_surface_site()):
+        # Only N, O and S atoms can donate or accept the lone pair
+        if atom.is_nos():
+            paths = pathfinder.find_adj_lone_pair_multiple_bond_delocalization_paths(atom)
+            for atom1, atom2, bond12, direction in paths:
+                # The bond is changed first, so that changing the lone pairs also updates the charge of atom1
+                if direction == 1:  # The direction <increasing> the bond order
+                    bond12.increment_order()
+                    atom1.decrement_lone_pairs()
+                elif direction == 2:  # The direction <decreasing> the bond order
+                    bond12.decrement_order()
+                    atom1.increment_lone_pairs()
+                atom2.update_charge()
+                # Make a copy of structure, with the atom types of the changed atoms updated
+                structure = _copy_resonance_structure(mol, [atom1, atom2], buckets)
+                # Restore current structure
+                if direction == 1:  # The direction <increasing> the bond order
+                    bond12.decrement_order()
+                    atom1.increment_lone_pairs()
+                elif direction == 2:  # The direction <decreasing> the bond order
+                    bond12.increment_order()
+                    atom1.decrement_lone_pairs()
+                atom2.update_charge()
+                # Don't append resonance structure if it creates an undefined atomtype
+                if structure is not None and not (structure.get_net_charge() and structure.contains_surface_site()):
                     structures.append(structure)
     return structures
 
 
-def generate_adj_lone_pair_radical_multiple_bond_resonance_structures(mol):
+def generate_adj_lone_pair_radical_multiple_bond_resonance_structures(mol, buckets=None):
     """
     Generate all of the resonance structures formed by lone electron pair - radical - multiple bond shifts between adjacent atoms.
     Example: [:N.]=[CH2] <=> [::N]-[.CH2]
@@ -480,89 +592,98 @@ def generate_adj_lone_pair_radical_multiple_bond_resonance_structures(mol):
     radical transformations.
     (In direction 1 atom1 <losses> a lone pair, gains a radical, and atom2 looses a radical.
     In direction 2 atom1 <gains> a lone pair, looses a radical, and atom2 gains a radical)
+    Structures isomorphic to any in `buckets` are skipped, see :func:`_copy_resonance_structure`.
     """
-    cython.declare(structures=list, paths=list, index=cython.int, structure=Molecule, direction=cython.int)
-    cython.declare(atom=Atom, atom1=Atom, atom2=Atom, bond12=Bond)
-    cython.declare(v1=Vertex, v2=Vertex)
+    cython.declare(structures=list, paths=list, structure=Molecule, direction=cython.int, candidates=dict)
+    cython.declare(atom=Atom, atom1=Atom, atom2=Atom, radical=Atom, bond12=Bond)
+
+    # Every path has a radical on the N, O or S atom (direction 2) or on its neighbor (direction 1),
+    # so only these atoms are searched instead of all atoms. They are collected by id to visit each once.
+    candidates = {}
+    for radical in mol.get_radical_atoms():
+        if radical.is_nos():
+            candidates[id(radical)] = radical
+        for atom in radical.edges:
+            # Only N, O and S atoms can donate or accept the lone pair
+            if atom.is_nos():
+                candidates[id(atom)] = atom
 
     structures = []
-    if mol.is_radical():  # Iterate over radicals in structure
-        for atom in mol.vertices:
-            paths = pathfinder.find_adj_lone_pair_radical_multiple_bond_delocalization_paths(atom)
-            for atom1, atom2, bond12, direction in paths:
-                if direction == 1:  # The direction <increasing> the bond order
-                    atom1.decrement_lone_pairs()
-                    bond12.increment_order()
-                    atom1.increment_radical()
-                    atom2.decrement_radical()
-                elif direction == 2:  # The direction <decreasing> the bond order
-                    atom1.increment_lone_pairs()
-                    bond12.decrement_order()
-                    atom1.decrement_radical()
-                    atom2.increment_radical()
-                atom1.update_charge()
-                atom2.update_charge()
-                # Make a copy of structure
-                structure = mol.copy(deep=True)
-                # Restore current structure
-                if direction == 1:  # The direction <increasing> the bond order
-                    atom1.increment_lone_pairs()
-                    bond12.decrement_order()
-                    atom1.decrement_radical()
-                    atom2.increment_radical()
-                elif direction == 2:  # The direction <decreasing> the bond order
-                    atom1.decrement_lone_pairs()
-                    bond12.increment_order()
-                    atom1.increment_radical()
-                    atom2.decrement_radical()
-                atom1.update_charge()
-                atom2.update_charge()
-                try:
-                    structure.update_atomtypes(log_species=False)
-                except AtomTypeError:
-                    pass  # Don't append resonance structure if it creates an undefined atomtype
-                else:
-                    structures.append(structure)
+    for atom in candidates.values():
+        paths = pathfinder.find_adj_lone_pair_radical_multiple_bond_delocalization_paths(atom)
+        for atom1, atom2, bond12, direction in paths:
+            # The lone pairs are changed last, so that this also updates the charge of atom1
+            if direction == 1:  # The direction <increasing> the bond order
+                bond12.increment_order()
+                atom1.increment_radical()
+                atom2.decrement_radical()
+                atom1.decrement_lone_pairs()
+            elif direction == 2:  # The direction <decreasing> the bond order
+                bond12.decrement_order()
+                atom1.decrement_radical()
+                atom2.increment_radical()
+                atom1.increment_lone_pairs()
+            atom2.update_charge()
+            # Make a copy of structure, with the atom types of the changed atoms updated
+            structure = _copy_resonance_structure(mol, [atom1, atom2], buckets)
+            # Restore current structure
+            if direction == 1:  # The direction <increasing> the bond order
+                bond12.decrement_order()
+                atom1.decrement_radical()
+                atom2.increment_radical()
+                atom1.increment_lone_pairs()
+            elif direction == 2:  # The direction <decreasing> the bond order
+                bond12.increment_order()
+                atom1.increment_radical()
+                atom2.decrement_radical()
+                atom1.decrement_lone_pairs()
+            atom2.update_charge()
+            if structure is not None:  # Don't append resonance structure if it creates an undefined atomtype
+                structures.append(structure)
     return structures
 
 
-def generate_N5dc_radical_resonance_structures(mol):
+def generate_N5dc_radical_resonance_structures(mol, buckets=None):
     """
     Generate all of the resonance structures formed by radical and lone pair shifts mediated by an N5dc atom.
+    Structures isomorphic to any in `buckets` are skipped, see :func:`_copy_resonance_structure`.
     """
-    cython.declare(structures=list, paths=list, index=cython.int, structure=Molecule)
+    cython.declare(structures=list, paths=list, structure=Molecule)
     cython.declare(atom=Atom, atom2=Atom, atom3=Atom)
-    cython.declare(v1=Vertex, v2=Vertex)
 
     structures = []
     for atom in mol.vertices:
         if atom.atomtype.label == 'N5dc' and atom.radical_electrons == 0 and len(atom.edges) == 3:
             paths = pathfinder.find_N5dc_radical_delocalization_paths(atom)
             for atom2, atom3 in paths:
+                # Changing the lone pairs last also updates the charges
                 atom2.decrement_radical()
                 atom2.increment_lone_pairs()
-                atom3.decrement_lone_pairs()
                 atom3.increment_radical()
-                atom2.update_charge()
-                atom3.update_charge()
-                # Make a copy of structure
-                structure = mol.copy(deep=True)
+                atom3.decrement_lone_pairs()
+                # Make a copy of structure, with the atom types of the changed atoms updated
+                structure = _copy_resonance_structure(mol, [atom2, atom3], buckets)
                 # Restore current structure
                 atom2.increment_radical()
                 atom2.decrement_lone_pairs()
-                atom3.increment_lone_pairs()
                 atom3.decrement_radical()
-                atom2.update_charge()
-                atom3.update_charge()
-                try:
-                    structure.update_atomtypes(log_species=False)
-                except AtomTypeError:
-                    pass  # Don't append resonance structure if it creates an undefined atomtype
-                else:
+                atom3.increment_lone_pairs()
+                if structure is not None:  # Don't append resonance structure if it creates an undefined atomtype
                     structures.append(structure)
     return structures
 
 
+# Resonance algorithms which skip structures isomorphic to known ones, see _copy_resonance_structure
+_bucket_resonance_algorithms = {
+    generate_allyl_delocalization_resonance_structures,
+    generate_lone_pair_multiple_bond_resonance_structures,
+    generate_adj_lone_pair_radical_resonance_structures,
+    generate_adj_lone_pair_multiple_bond_resonance_structures,
+    generate_adj_lone_pair_radical_multiple_bond_resonance_structures,
+    generate_N5dc_radical_resonance_structures,
+}
+
+
 def generate_optimal_aromatic_resonance_structures(mol, features=None):
     """
     Generate the aromatic form of the molecule. For radicals, generates the form with the most aromatic rings.
@@ -574,7 +695,7 @@ def generate_optimal_aromatic_resonance_structures(mol, features=None):
     """
     cython.declare(molecule=Molecule, rings=list, aromaticBonds=list, kekuleList=list, maxNum=cython.int, mol_list=list,
                    new_mol_list=list, ring=list, bond=Bond, order=float, originalBonds=list, originalOrder=list,
-                   i=cython.int, counter=cython.int)
+                   i=cython.int, counter=cython.int, buckets=dict, bucket=list)
 
     if features is None:
         features = analyze_molecule(mol)
@@ -582,14 +703,17 @@ def generate_optimal_aromatic_resonance_structures(mol, features=None):
     if not features['is_cyclic']:
         return []
 
-    # Copy the molecule so we don't affect the original
-    molecule = mol.copy(deep=True)
-
     # Attempt to rearrange electrons to obtain a structure with the most aromatic rings
     # Possible rearrangements include aryne resonance and allyl resonance
     res_list = [generate_aryne_resonance_structures]
     if features['is_radical'] and not features['is_aryl_radical']:
         res_list.append(generate_allyl_delocalization_resonance_structures)
+    elif not mol.is_aromatic() and not mol.get_aromatic_rings()[1] and not _has_aryne_pattern(mol):
+        # No aromatic rings and no rearrangements which could form any, so don't bother copying the molecule
+        return []
+
+    # Copy the molecule so we don't affect the original
+    molecule = mol.copy(deep=True)
 
     if molecule.is_aromatic():
         kekule_list = generate_kekule_structure(molecule)
@@ -609,6 +733,7 @@ def generate_optimal_aromatic_resonance_structures(mol, features=None):
     arom_options = sorted(mol_dict.keys(), reverse=True)
 
     new_mol_list = []
+    buckets = {}
     for num in arom_options:
         mol_list = mol_dict[num]
         # Generate the aromatic resonance structure(s)
@@ -620,10 +745,13 @@ def generate_optimal_aromatic_resonance_structures(mol, features=None):
                 # This could be due to incorrect aromaticity perception by RDKit
                 continue
 
-            for mol1 in new_mol_list:
+            # Only structures with the same isomorphism key need to be compared
+            bucket = buckets.setdefault(_get_isomorphism_key(mol0), [])
+            for mol1 in bucket:
                 if mol1.is_isomorphic(mol0):
                     break
             else:
+                bucket.append(mol0)
                 new_mol_list.append(mol0)
 
         if new_mol_list:
@@ -645,8 +773,19 @@ def generate_aromatic_resonance_structure(mol, aromatic_bonds=None, copy=True):
     Returns:
         List of one molecule if successful, empty list otherwise
     """
+    cython.declare(molecule=Molecule, indices=dict, atoms=list, ring=list, bond=Bond, atom=Atom, ring_atoms=list,
+                   atoms_in_ring=dict, all_atoms=dict, original_order=list, num_rings=cython.int, index=cython.int,
+                   i=cython.int, counter=cython.int)
+
     if copy:
         molecule = mol.copy(deep=True)
+        if aromatic_bonds is None:
+            # Perceive aromaticity on the original molecule, where the result may already be cached,
+            # and map the aromatic bonds onto the copy, which has its atoms in the same order
+            indices = {id(atom): i for i, atom in enumerate(mol.vertices)}
+            atoms = molecule.vertices
+            aromatic_bonds = [[atoms[indices[id(bond.atom1)]].edges[atoms[indices[id(bond.atom2)]]] for bond in ring]
+                              for ring in mol.get_aromatic_rings()[1]]
     else:
         molecule = mol
 
@@ -675,26 +814,42 @@ def generate_aromatic_resonance_structure(mol, aromatic_bonds=None, copy=True):
         for ring, original_order in zip(aromatic_bonds, original_bonds):
             for bond, order in zip(ring, original_order):
                 bond.order = order
+        # Changing the order of a ring bond only affects the atom types of the atoms in that ring,
+        # so only the ring atoms need to be updated from here on
+        # The atoms are collected by id, since atoms of the same element share a hash
+        ring_atoms = []
+        all_atoms = {}
+        for ring in aromatic_bonds:
+            atoms_in_ring = {}
+            for bond in ring:
+                atoms_in_ring[id(bond.atom1)] = bond.atom1
+                atoms_in_ring[id(bond.atom2)] = bond.atom2
+            ring_atoms.append(list(atoms_in_ring.values()))
+            all_atoms.update(atoms_in_ring)
+        molecule.update_atomtypes(log_species=False, raise_exception=True, atoms=list(all_atoms.values()))
         # Try to make each ring aromatic, one by one
+        num_rings = len(aromatic_bonds)
+        pending = deque(range(num_rings))  # Indices of the rings which still need to be made aromatic
         i = 0  # Track how many rings are aromatic
         counter = 0  # Track total number of attempts to avoid infinite loops
-        while i < len(aromatic_bonds) and counter < 2 * len(aromatic_bonds):
+        while pending and counter < 2 * num_rings:
             counter += 1
-            original_order = []
-            for bond in aromatic_bonds[i]:
-                original_order.append(bond.order)
+            index = pending.popleft()
+            ring = aromatic_bonds[index]
+            # Orders are saved on each attempt, since rings made aromatic earlier may share bonds with this one
+            original_order = [bond.order for bond in ring]
+            for bond in ring:
                 bond.order = 1.5
             try:
-                molecule.update_atomtypes(log_species=False)
+                molecule.update_atomtypes(log_species=False, raise_exception=True, atoms=ring_atoms[index])
             except AtomTypeError:
                 # This ring could not be made aromatic, possibly because it depends on other rings
                 # Undo changes
-                for bond, order in zip(aromatic_bonds[i], original_order):
+                for bond, order in zip(ring, original_order):
                     bond.order = order
-                # Move it to the end of the list, and go on to the next ring
-                aromatic_bonds.append(aromatic_bonds.pop(i))
-                molecule.update_atomtypes(log_species=False)
-                continue
+                molecule.update_atomtypes(log_species=False, raise_exception=True, atoms=ring_atoms[index])
+                # Retry it after the other rings
+                pending.append(index)
             else:
                 # We're done with this ring, so go on to the next ring
                 i += 1
@@ -719,45 +874,17 @@ def generate_aryne_resonance_structures(mol):
     Especially for polycyclic arynes, enumeration of all resonance forms is
     related to enumeration of all Kekule structures, which is very difficult.
     """
-    cython.declare(rings=list, ring=list, new_mol_list=list, bond_list=list,
-                   i=cython.int, j=cython.int, bond_orders=str, new_orders=str,
-                   ind=cython.int, bond=Bond, new_mol=Molecule)
+    cython.declare(rings=list, ring=list, new_mol_list=list, bond_list=list, match=tuple,
+                   i=cython.int, bond_orders=str, new_orders=str, bond=Bond, new_mol=Molecule)
 
     rings = mol.get_relevant_cycles()
     rings = [ring for ring in rings if len(ring) == 6]
 
     new_mol_list = []
     for ring in rings:
-        # Get bond orders
-        bond_list = mol.get_edges_in_cycle(ring)
-        bond_orders = ''.join([bond.get_order_str() for bond in bond_list])
-        new_orders = None
-        # Check for expected bond patterns
-        if bond_orders.count('T') == 1:
-            # Reorder the list so the triple bond is first
-            ind = bond_orders.index('T')
-            bond_orders = bond_orders[ind:] + bond_orders[:ind]
-            bond_list = bond_list[ind:] + bond_list[:ind]
-            # Check for patterns
-            if bond_orders == 'TSDSDS':
-                new_orders = 'DDSDSD'
-        elif bond_orders.count('D') == 4:
-            # Search for DDD and reorder the list so that it comes first
-            if 'DDD' in bond_orders:
-                ind = bond_orders.index('DDD')
-                bond_orders = bond_orders[ind:] + bond_orders[:ind]
-                bond_list = bond_list[ind:] + bond_list[:ind]
-            elif bond_orders.startswith('DD') and bond_orders.endswith('D'):
-                bond_orders = bond_orders[-1:] + bond_orders[:-1]
-                bond_list = bond_list[-1:] + bond_list[:-1]
-            elif bond_orders.startswith('D') and bond_orders.endswith('DD'):
-                bond_orders = bond_orders[-2:] + bond_orders[:-2]
-                bond_list = bond_list[-2:] + bond_list[:-2]
-            # Check for patterns
-            if bond_orders == 'DDDSDS':
-                new_orders = 'STSDSD'
-
-        if new_orders is not None:
+        match = _match_aryne_pattern(mol.get_edges_in_cycle(ring))
+        if match is not None:
+            bond_list, bond_orders, new_orders = match
             # We matched one of our patterns, so we can now change the bonds
             for i, bond in enumerate(bond_list):
                 bond.set_order_str(new_orders[i])
@@ -777,6 +904,60 @@ def generate_aryne_resonance_structures(mol):
     return new_mol_list
 
 
+def _match_aryne_pattern(bond_list):
+    """
+    Check the bonds of a 6-membered ring for the bond patterns of :func:`generate_aryne_resonance_structures`.
+
+    Returns a tuple of the bonds and their bond order string, both rotated so that the pattern starts with the first
+    bond, and the bond order string of the other resonance form, or ``None`` if the ring matches neither pattern.
+    """
+    cython.declare(bond_orders=str, new_orders=str, ind=cython.int)
+
+    bond_orders = ''.join([bond.get_order_str() for bond in bond_list])
+    new_orders = None
+    # Check for expected bond patterns
+    if bond_orders.count('T') == 1:
+        # Reorder the list so the triple bond is first
+        ind = bond_orders.index('T')
+        bond_orders = bond_orders[ind:] + bond_orders[:ind]
+        bond_list = bond_list[ind:] + bond_list[:ind]
+        # Check for patterns
+        if bond_orders == 'TSDSDS':
+            new_orders = 'DDSDSD'
+    elif bond_orders.count('D') == 4:
+        # Search for DDD and reorder the list so that it comes first
+        if 'DDD' in bond_orders:
+            ind = bond_orders.index('DDD')
+            bond_orders = bond_orders[ind:] + bond_orders[:ind]
+            bond_list = bond_list[ind:] + bond_list[:ind]
+        elif bond_orders.startswith('DD') and bond_orders.endswith('D'):
+            bond_orders = bond_orders[-1:] + bond_orders[:-1]
+            bond_list = bond_list[-1:] + bond_list[:-1]
+        elif bond_orders.startswith('D') and bond_orders.endswith('DD'):
+            bond_orders = bond_orders[-2:] + bond_orders[:-2]
+            bond_list = bond_list[-2:] + bond_list[:-2]
+        # Check for patterns
+        if bond_orders == 'DDDSDS':
+            new_orders = 'STSDSD'
+
+    if new_orders is None:
+        return None
+    return bond_list, bond_orders, new_orders
+
+
+def _has_aryne_pattern(mol):
+    """
+    Return ``True`` if any 6-membered ring of `mol` has one of the bond patterns of
+    :func:`generate_aryne_resonance_structures`, without generating the structures.
+    """
+    cython.declare(ring=list)
+
+    for ring in mol.get_relevant_cycles():
+        if len(ring) == 6 and _match_aryne_pattern(mol.get_edges_in_cycle(ring)) is not None:
+            return True
+    return False
+
+
 def generate_kekule_structure(mol):
     """
     Generate a kekulized (single-double bond) form of the molecule.
@@ -820,14 +1001,30 @@ def generate_isomorphic_resonance_structures(mol, saturate_h=False):
     """
 
     cython.declare(isomorphic_isomers=list, isomers=list, index=int, max_val_e=int, order=float, num_h_to_add=int,
-                   isomer=Molecule, newIsomer=Molecule, isom=Molecule, atom=Atom, a=Atom, b=Bond, newAtoms=list)
+                   isomer=Molecule, newIsomer=Molecule, isom=Molecule, atom=Atom, a=Atom, b=Bond, newAtoms=list,
+                   buckets=dict, bucket=list, vertices=list, known=cython.bint, num_atoms=int, hydrogens=list,
+                   saturated=dict, old_atomtypes=list)
 
     if saturate_h:  # Add explicit hydrogen atoms to complete structure if desired
+        num_atoms = len(mol.vertices)
         Saturator.saturate(mol.vertices)
+        # The resonance structures inherit the atom types of the atoms that are not changed, so the new hydrogens
+        # and the atoms they were added to are typed here. The original atom types are restored at the end.
+        hydrogens = mol.vertices[num_atoms:]
+        saturated = {}
+        for atom in hydrogens:
+            for a in atom.edges:
+                saturated[id(a)] = a
+        old_atomtypes = [a.atomtype for a in saturated.values()]
+        for atom in list(saturated.values()) + hydrogens:
+            atom.atomtype = get_atomtype(atom, atom.edges)
 
     isomorphic_isomers = [mol]  # resonance isomers that are isomorphic to the parameter isomer.
 
     isomers = [mol]
+    # Only isomers with matching keys need to be checked for isomorphism. The isomorphism check may sort the atoms
+    # of both molecules in place, so the buckets hold a copy of each isomer, to keep the atom order of the isomers.
+    buckets = {_get_isomorphism_key(mol): [mol.copy(deep=True)]}
 
     # Iterate over resonance isomers
     index = 0
@@ -840,12 +1037,25 @@ def generate_isomorphic_resonance_structures(mol, saturate_h=False):
 
         for newIsomer in new_isomers:
             # Append to isomer list if unique
-            for isom in isomers:
-                if isom.copy(deep=True).is_isomorphic(newIsomer.copy(deep=True)):
-                    isomorphic_isomers.append(newIsomer)
-                    break
+            bucket = buckets.setdefault(_get_isomorphism_key(newIsomer), [])
+            known = False
+            if bucket:
+                # Give the isomorphism check a list of the vertices of the new isomer, and restore the original
+                # list afterwards, so that the new isomer is only copied if it is added to the bucket
+                vertices = newIsomer.vertices
+                newIsomer.vertices = vertices[:]
+                try:
+                    for isom in bucket:
+                        if isom.is_isomorphic(newIsomer):
+                            known = True
+                            break
+                finally:
+                    newIsomer.vertices = vertices
+            if known:
+                isomorphic_isomers.append(newIsomer)
             else:
                 isomers.append(newIsomer)
+                bucket.append(newIsomer.copy(deep=True))
 
         # Move to next resonance isomer
         index += 1
@@ -853,6 +1063,8 @@ def generate_isomorphic_resonance_structures(mol, saturate_h=False):
     if saturate_h:  # remove hydrogens before returning isomorphic_isomers
         for isomer in isomorphic_isomers:
             isomer.delete_hydrogens()
+        for a, atomtype in zip(saturated.values(), old_atomtypes):
+            a.atomtype = atomtype
 
     return isomorphic_isomers
 
@@ -913,6 +1125,135 @@ def generate_clar_structures(mol):
     return mol_list
 
 
+def _get_clar_connectivity_matrix(atoms, aromatic_rings, bonds):
+    """
+    Return the connectivity matrix used by :func:`_build_clar_lp`, as a NumPy array with a row for each of the `atoms`
+    and a column for each of the `aromatic_rings` followed by one for each of the `bonds`. Entries are 1 if the atom is
+    in the ring or bond, and 0 otherwise.
+    """
+    cython.declare(l=cython.int, atom_index=dict, ring_atom_indices=list, ring_sizes=list, i=cython.int,
+                   ring=list, atom=Atom, bond=Bond)
+
+    l = len(aromatic_rings)
+
+    # The rings and bonds are first converted to the row indices of their atoms, looked up by atom id, so that the
+    # matrix can then be filled by array indexing. The ring atoms are stored in a single flat list along with the size
+    # of each ring, and the atom outside the rings of an exocyclic bond gets an index of -1.
+    atom_index = {}
+    for i, atom in enumerate(atoms):
+        atom_index[id(atom)] = i
+    ring_atom_indices = []
+    ring_sizes = []
+    for ring in aromatic_rings:
+        ring_sizes.append(len(ring))
+        for atom in ring:
+            ring_atom_indices.append(atom_index[id(atom)])
+    bond_atom_indices = np.array([(atom_index.get(id(bond.atom1), -1), atom_index.get(id(bond.atom2), -1))
+                                  for bond in bonds], dtype=np.int32).reshape(-1, 2)
+    bond_columns = l + np.arange(len(bonds))
+
+    a = np.zeros((len(atoms), l + len(bonds)))
+    a[ring_atom_indices, np.repeat(np.arange(l), ring_sizes)] = 1
+    for i in range(2):
+        in_rings = bond_atom_indices[:, i] >= 0
+        a[bond_atom_indices[in_rings, i], bond_columns[in_rings]] = 1
+
+    return a
+
+
+def _build_clar_lp(atoms, aromatic_rings, bonds, exo):
+    """
+    Set up the lpsolve problem used by :func:`_clar_optimization` to find Clar structures, with one
+    variable for each of the aromatic rings followed by one for each of the bonds. The variables are bounded
+    between 0 and 1 but are not required to be integers, so the problem starts out as its LP relaxation.
+
+    Args:
+        atoms           a list of :class:`Atom` objects in the aromatic rings
+        aromatic_rings  a list of aromatic rings, each a list of :class:`Atom` objects
+        bonds           a list of :class:`Bond` objects involving the ring atoms
+        exo             a list with the fixed order of each exocyclic bond, or ``None`` for ring bonds
+
+    Returns the lpsolve handle of the problem, which should be deleted by the caller.
+    """
+    cython.declare(l=cython.int, m=cython.int, n=cython.int, lp=cython.int, columns=list, i=cython.int, j=cython.int)
+
+    from lpsolve55 import lpsolve
+
+    # Dimensions
+    l = len(aromatic_rings)
+    m = len(atoms)
+    n = l + len(bonds)
+
+    # Connectivity matrix which indicates which rings and bonds each atom is in
+    # Part of equality constraint Ax=b
+    a = _get_clar_connectivity_matrix(atoms, aromatic_rings, bonds)
+
+    # Objective vector for optimization: sextets have a weight of 1, double bonds have a weight of 0
+    objective = np.zeros(n)
+    objective[:l] = 1
+
+    # Set up LP problem
+    lp = lpsolve('make_lp', 0, n)                  # initialize lp with no constraints and n columns
+    lpsolve('set_verbose', lp, 2)                  # reduce messages from lpsolve
+    lpsolve('set_obj_fn', lp, objective.tolist())  # set objective function
+    lpsolve('set_maxim', lp)                       # set solver to maximize objective
+    lpsolve('set_upbo', lp, [1] * n)               # set upper bound of 1 for all variables
+
+    # Add the rows of the constraint matrix as equality constraints with a right hand side of 1. Each row only has a
+    # few nonzero entries, so only their (1-indexed) columns are passed to lpsolve.
+    lpsolve('set_add_rowmode', lp, True)
+    for i in range(m):
+        columns = (np.flatnonzero(a[i]) + 1).tolist()
+        lpsolve('add_constraintex', lp, [1] * len(columns), columns, '=', 1)
+    lpsolve('set_add_rowmode', lp, False)
+
+    # Constrain values of exocyclic bonds, since we don't want to modify them
+    for j, order in enumerate(exo):
+        if order is not None:
+            # NOTE: lpsolve indexes from 1, and the bond variables follow the l ring variables
+            lpsolve('set_bounds', lp, l + j + 1, order, order)
+
+    return lp
+
+
+def _solve_clar_milp(a, exo, constraints):
+    """
+    Solve the Clar structure problem set up by :func:`_clar_optimization` using :func:`scipy.optimize.milp`,
+    as an alternative to lpsolve. `a` is the connectivity matrix from :func:`_get_clar_connectivity_matrix`, `exo`
+    has the fixed order of each exocyclic bond (or ``None`` for ring bonds), and `constraints` is a list of additional
+    ``(row, value)`` constraints of the form ``row * x <= value``.
+
+    Returns a tuple of the status, which is 0 if an optimal solution was found, the objective value, and the solution.
+    """
+    cython.declare(l=cython.int, n=cython.int, j=cython.int, linear_constraints=list)
+
+    from scipy.optimize import Bounds, LinearConstraint
+
+    n = a.shape[1]
+    l = n - len(exo)
+
+    # Sextets have a weight of 1 and double bonds have a weight of 0, negated since milp minimizes the objective
+    objective = np.zeros(n)
+    objective[:l] = -1
+
+    # All variables are binary, except that exocyclic bonds keep their orders
+    lower = np.zeros(n)
+    upper = np.ones(n)
+    for j, order in enumerate(exo):
+        if order is not None:
+            lower[l + j] = upper[l + j] = order
+
+    linear_constraints = [LinearConstraint(a, 1, 1)]
+    if constraints:
+        linear_constraints.append(LinearConstraint(np.array([constraint[0] for constraint in constraints]),
+                                                   -np.inf, np.array([constraint[1] for constraint in constraints])))
+
+    result = milp(objective, integrality=np.ones(n), bounds=Bounds(lower, upper), constraints=linear_constraints)
+    if result.x is None:
+        return result.status, 0, []
+    return result.status, -result.fun, result.x.tolist()
+
+
 def _clar_optimization(mol, constraints=None, max_num=None):
     """
     Implements linear programming algorithm for finding Clar structures. This algorithm maximizes the number
@@ -927,40 +1268,48 @@ def _clar_optimization(mol, constraints=None, max_num=None):
     The optimization solution is a list of boolean values with sextet assignments followed by double bond assignments,
     with indices corresponding to the list of aromatic rings and list of bonds, respectively.
 
+    All optimal solutions are enumerated using a single LP problem. After each solution is found, a constraint
+    excluding its set of sextets is added and the problem is solved again, until the number of sextets drops.
+    The solutions are returned in the reverse of the order in which they are found.
+    The problem is solved using :func:`scipy.optimize.milp` if it is available (SciPy 1.9 or later), and using lpsolve
+    otherwise. With lpsolve, the LP relaxation is solved first, and integer variables are only required once it gives
+    a fractional solution.
+
     Method adapted from:
         Hansen, P.; Zheng, M. The Clar Number of a Benzenoid Hydrocarbon and Linear Programming.
             J. Math. Chem. 1994, 15 (1), 93–107.
     """
-    cython.declare(molecule=Molecule, aromatic_rings=list, exo=list, l=cython.int, m=cython.int, n=cython.int,
-                   a=list, objective=list, status=cython.int, solution=list, innerSolutions=list)
-
-    from lpsolve55 import lpsolve
-
-    # Make a copy of the molecule so we don't destroy the original
-    molecule = mol.copy(deep=True)
+    cython.declare(aromatic_rings=list, atoms=list, bonds=list, exo=list, l=cython.int, n=cython.int, lp=cython.int,
+                   obj_val=cython.double, num_sextets=cython.int, integer=cython.bint, fractional=cython.bint,
+                   status=cython.int, solution=list, solutions=list, indices=dict, y=list, columns=list, i=cython.int,
+                   ring_atoms=dict, ring_bonds=dict, ring=list, atom=Atom, key=Atom, bond=Bond)
 
-    aromatic_rings = molecule.get_aromatic_rings()[0]
+    # The molecule itself is only read here, and is copied for each solution found
+    aromatic_rings = mol.get_aromatic_rings()[0]
     aromatic_rings.sort(key=lambda x: sum([atom.id for atom in x]))
 
     if not aromatic_rings:
         return []
 
-    # Get list of atoms that are in rings
-    atoms = set()
+    # Get list of atoms that are in rings, keyed by id since atoms of the same element share a hash
+    ring_atoms = {}
     for ring in aromatic_rings:
-        atoms.update(ring)
-    atoms = sorted(atoms, key=lambda x: x.id)
+        for atom in ring:
+            ring_atoms[id(atom)] = atom
+    atoms = sorted(ring_atoms.values(), key=lambda x: x.id)
 
     # Get list of bonds involving the ring atoms, ignoring bonds to hydrogen
-    bonds = set()
+    ring_bonds = {}
     for atom in atoms:
-        bonds.update([atom.bonds[key] for key in atom.bonds.keys() if key.is_non_hydrogen()])
-    bonds = sorted(bonds, key=lambda x: (x.atom1.id, x.atom2.id))
+        for key, bond in atom.edges.items():
+            if key.element.number != 1:
+                ring_bonds[id(bond)] = bond
+    bonds = sorted(ring_bonds.values(), key=lambda x: (x.atom1.id, x.atom2.id))
 
     # Identify exocyclic bonds, and save their bond orders
     exo = []
     for bond in bonds:
-        if bond.atom1 not in atoms or bond.atom2 not in atoms:
+        if id(bond.atom1) not in ring_atoms or id(bond.atom2) not in ring_atoms:
             if bond.is_double():
                 exo.append(1)
             else:
@@ -968,90 +1317,126 @@ def _clar_optimization(mol, constraints=None, max_num=None):
         else:
             exo.append(None)
 
-    # Dimensions
+    # Atom indices, used to map the rings and bonds onto the copies of the molecule
+    indices = {}
+    for i, atom in enumerate(mol.atoms):
+        indices[id(atom)] = i
+
     l = len(aromatic_rings)
-    m = len(atoms)
     n = l + len(bonds)
 
-    # Connectivity matrix which indicates which rings and bonds each atom is in
-    # Part of equality constraint Ax=b
-    a = []
-    for atom in atoms:
-        in_ring = [1 if atom in ring else 0 for ring in aromatic_rings]
-        in_bond = [1 if atom in [bond.atom1, bond.atom2] else 0 for bond in bonds]
-        a.append(in_ring + in_bond)
-
-    # Objective vector for optimization: sextets have a weight of 1, double bonds have a weight of 0
-    objective = [1] * l + [0] * len(bonds)
-
-    # Solve LP problem using lpsolve
-    lp = lpsolve('make_lp', m, n)               # initialize lp with constraint matrix with m rows and n columns
-    lpsolve('set_verbose', lp, 2)               # reduce messages from lpsolve
-    lpsolve('set_obj_fn', lp, objective)        # set objective function
-    lpsolve('set_maxim', lp)                    # set solver to maximize objective
-    lpsolve('set_mat', lp, a)                   # set left hand side to constraint matrix
-    lpsolve('set_rh_vec', lp, [1] * m)          # set right hand side to 1 for all constraints
-    for i in range(m):                          # set all constraints as equality constraints
-        lpsolve('set_constr_type', lp, i + 1, '=')
-    lpsolve('set_binary', lp, [True] * n)       # set all variables to be binary
+    # With a single aromatic ring, the only optimal solution is a sextet in that ring, as long as no exocyclic
+    # double bond prevents it. All the bonds are then single, since the sextet uses up the ring atoms' pi electrons.
+    if l == 1 and constraints is None and max_num is None and 1 not in exo:
+        return [_copy_clar_solution(mol, indices, aromatic_rings, bonds, [1] + [0] * len(bonds))]
 
-    # Constrain values of exocyclic bonds, since we don't want to modify them
-    for i in range(l, n):
-        if exo[i - l] is not None:
-            # NOTE: lpsolve indexes from 1, so the variable we're changing should be i + 1
-            lpsolve('set_bounds', lp, i + 1, exo[i - l], exo[i - l])
-
-    # Add constraints to problem if provided
-    if constraints is not None:
-        for constraint in constraints:
-            try:
-                lpsolve('add_constraint', lp, constraint[0], '<=', constraint[1])
-            except Exception as e:
-                logging.debug('Unable to add constraint: {0} <= {1}'.format(constraint[0], constraint[1]))
-                logging.debug(mol.to_adjacency_list())
-                if str(e) == 'invalid vector.':
-                    raise ILPSolutionError('Unable to add constraint, likely due to '
-                                           'inconsistent aromatic ring perception.')
-                else:
-                    raise
+    # Use HiGHS through scipy.optimize.milp if it is available, and lpsolve otherwise
+    if milp is None:
+        from lpsolve55 import lpsolve
+        lp = _build_clar_lp(atoms, aromatic_rings, bonds, exo)
+        integer = False
+    else:
+        a = _get_clar_connectivity_matrix(atoms, aromatic_rings, bonds)
+        # The problem is solved from scratch each time, so constraints are collected rather than added to it
+        constraints = list(constraints) if constraints is not None else []
+        integer = True
 
-    status = lpsolve('solve', lp)
-    obj_val, solution = lpsolve('get_solution', lp)[0:2]
-    lpsolve('delete_lp', lp)  # Delete the LP problem to clear up memory
+    solutions = []
+    try:
+        # Add constraints to problem if provided
+        if milp is None and constraints is not None:
+            for constraint in constraints:
+                try:
+                    lpsolve('add_constraint', lp, constraint[0], '<=', constraint[1])
+                except Exception as e:
+                    logging.debug('Unable to add constraint: {0} <= {1}'.format(constraint[0], constraint[1]))
+                    logging.debug(mol.to_adjacency_list())
+                    if str(e) == 'invalid vector.':
+                        raise ILPSolutionError('Unable to add constraint, likely due to '
+                                               'inconsistent aromatic ring perception.')
+                    else:
+                        raise
+
+        while True:
+            if milp is None:
+                status = lpsolve('solve', lp)
+                obj_val, solution = lpsolve('get_solution', lp)[0:2]
+            else:
+                status, obj_val, solution = _solve_clar_milp(a, exo, constraints)
+            # Check that optimization was successful, before the objective value and solution are interpreted
+            if status != 0:
+                if not solutions:
+                    raise ILPSolutionError('Optimization could not find a valid solution.')
+                break
+
+            # The objective value counts the sextets, so round off any numerical noise from the solver once here
+            num_sextets = int(round(obj_val))
+
+            # Round off numerical noise in the solution, using a tolerance to check whether it is integer
+            values = np.array(solution)
+            rounded = np.round(values)
+            fractional = bool(np.any(np.abs(values - rounded) > 1e-6))
+            solution = rounded.astype(int).tolist()
+
+            # The LP relaxation usually has an integer optimum already, since the constraint matrix is the
+            # incidence matrix of the rings and bonds. Only require integer variables once it does not.
+            if not integer and fractional:
+                lpsolve('set_int', lp, [True] * n)
+                integer = True
+                continue
 
-    # Check that optimization was successful
-    if status != 0:
-        raise ILPSolutionError('Optimization could not find a valid solution.')
+            # Check that we the result contains at least one aromatic sextet
+            if num_sextets == 0:
+                break
+
+            # Check that the solution contains the maximum number of sextets possible
+            if max_num is None:
+                max_num = num_sextets  # This is the first solution, so the result should be an upper limit
+            elif num_sextets < max_num:
+                if not solutions:
+                    raise ILPSolutionError('Optimization obtained a sub-optimal solution.')
+                break
+
+            if fractional:
+                if not solutions:
+                    raise ILPSolutionError('Optimization obtained a non-integer solution.')
+                break
+
+            solutions.append(_copy_clar_solution(mol, indices, aromatic_rings, bonds, solution))
+
+            # Exclude this set of sextets from subsequent solutions
+            y = solution[0:l]
+            if milp is None:
+                # Only the (1-indexed) sextet columns are passed to lpsolve
+                columns = [i + 1 for i in range(l) if y[i]]
+                lpsolve('add_constraintex', lp, [1] * len(columns), columns, '<=', num_sextets - 1)
+            else:
+                constraints.append((y + [0] * len(bonds), num_sextets - 1))
+    finally:
+        if milp is None:
+            lpsolve('delete_lp', lp)  # Delete the LP problem to clear up memory
 
-    # Check that we the result contains at least one aromatic sextet
-    if obj_val == 0:
-        return []
+    # The last solution found is returned first
+    solutions.reverse()
+    return solutions
 
-    # Check that the solution contains the maximum number of sextets possible
-    if max_num is None:
-        max_num = obj_val  # This is the first solution, so the result should be an upper limit
-    elif obj_val < max_num:
-        raise ILPSolutionError('Optimization obtained a sub-optimal solution.')
-
-    if any([x != 1 and x != 0 for x in solution]):
-        raise ILPSolutionError('Optimization obtained a non-integer solution.')
-
-    # Generate constraints based on the solution obtained
-    y = solution[0:l]
-    new_a = y + [0] * len(bonds)
-    new_b = sum(y) - 1
-    if constraints is not None:
-        constraints.append((new_a, new_b))
-    else:
-        constraints = [(new_a, new_b)]
 
-    # Run optimization with additional constraints
-    try:
-        inner_solutions = _clar_optimization(mol, constraints=constraints, max_num=max_num)
-    except ILPSolutionError:
-        inner_solutions = []
+def _copy_clar_solution(mol, indices, aromatic_rings, bonds, solution):
+    """
+    Return a Clar solution from :func:`_clar_optimization` as a tuple of a deep copy of `mol`, the aromatic rings and
+    the bonds mapped onto the copy, and the solution itself. `indices` maps the ids of the atoms in `mol` to their
+    positions in its list of atoms.
+    """
+    cython.declare(new_mol=Molecule, new_atoms=list, ring=list, atom=Atom, bond=Bond)
 
-    return inner_solutions + [(molecule, aromatic_rings, bonds, solution)]
+    new_mol = mol.copy(deep=True)
+    new_atoms = new_mol.atoms
+    return (
+        new_mol,
+        [[new_atoms[indices[id(atom)]] for atom in ring] for ring in aromatic_rings],
+        [new_atoms[indices[id(bond.atom1)]].edges[new_atoms[indices[id(bond.atom2)]]] for bond in bonds],
+        solution,
+    )
 
 
 def _clar_transformation(mol, aromatic_ring):
@@ -1060,18 +1445,18 @@ def _clar_transformation(mol, aromatic_ring):
 
     Args:
         mol             a :class:`Molecule` object
-        aromaticRing    a list of :class:`Atom` objects corresponding to an aromatic ring in mol
+        aromaticRing    a list of :class:`Atom` objects corresponding to an aromatic ring in mol, in cyclic order
+                        as returned by ring perception
 
     This function directly modifies the input molecule and does not return anything.
     """
-    cython.declare(bondList=list, i=cython.int, atom1=Atom, atom2=Atom, bond=Bond)
-
-    bond_list = []
-
-    for i, atom1 in enumerate(aromatic_ring):
-        for atom2 in aromatic_ring[i + 1:]:
-            if mol.has_bond(atom1, atom2):
-                bond_list.append(mol.get_bond(atom1, atom2))
-
-    for bond in bond_list:
-        bond.order = 1.5
+    cython.declare(i=cython.int, k=cython.int, atom1=Atom, atom2=Atom, bond=Bond)
+
+    # Since the ring atoms are in cyclic order, the ring bonds are those between consecutive atoms
+    k = len(aromatic_ring)
+    for i in range(k):
+        atom1 = aromatic_ring[i]
+        atom2 = aromatic_ring[(i + 1) % k]
+        bond = atom1.edges.get(atom2)
+        if bond is not None:
+            bond.order = 1.5
@@ -27,12 +27,23 @@
 #                                                                             #
 ###############################################################################
 
+import importlib.util
 import unittest
+from unittest import mock
+
+import scipy.optimize
 
 from external.wip import work_in_progress
 from rmgpy.molecule.molecule import Molecule
-from rmgpy.molecule.resonance import _clar_optimization, _clar_transformation, generate_clar_structures, \
-    generate_kekule_structure, generate_optimal_aromatic_resonance_structures, generate_resonance_structures
+from rmgpy.molecule.resonance import _clar_optimization, _clar_transformation, _copy_resonance_structure, \
+    _generate_resonance_structures, _get_clar_connectivity_matrix, _get_isomorphism_key, \
+    _has_aryne_pattern, _solve_clar_milp, analyze_molecule, generate_adj_lone_pair_multiple_bond_resonance_structures, \
+    generate_adj_lone_pair_radical_resonance_structures, generate_allyl_delocalization_resonance_structures, \
+    generate_clar_structures, generate_isomorphic_resonance_structures, generate_kekule_structure, \
+    generate_optimal_aromatic_resonance_structures, generate_resonance_structures, populate_resonance_algorithms
+
+NO_MILP = not hasattr(scipy.optimize, 'milp')
+NO_LPSOLVE = importlib.util.find_spec('lpsolve55') is None
 
 
 class ResonanceTest(unittest.TestCase):
@@ -390,6 +401,12 @@ multiplicity 2
         self.assertTrue(mol_list1[1].is_isomorphic(mol2))
         self.assertTrue(mol_list2[1].is_isomorphic(mol1))
 
+    def test_has_aryne_pattern(self):
+        """Test that both aryne forms of benzyne are recognized without generating structures"""
+        self.assertTrue(_has_aryne_pattern(Molecule(smiles="C1=CC=C=C=C1")))
+        self.assertTrue(_has_aryne_pattern(Molecule(smiles="C1C#CC=CC=1")))
+        self.assertFalse(_has_aryne_pattern(Molecule(smiles="C1=CCCCC1")))
+
     def test_aryne_2_rings(self):
         """Test aryne resonance in naphthyne"""
         mol1 = Molecule(smiles="C12=CC=C=C=C1C=CC=C2")
@@ -1066,6 +1083,106 @@ multiplicity 2
 
         self.assertEqual(len(out), 1)
 
+    def test_keep_isomorphic_structures_for_aromatic_radical(self):
+        """Test that keep_isomorphic is applied to the Kekule and allyl structures of an aromatic radical."""
+        mol = Molecule(smiles='[CH2]c1ccccc1')
+        out_isomorphic = generate_resonance_structures(mol, keep_isomorphic=True, filter_structures=False)
+        out = generate_resonance_structures(mol, keep_isomorphic=False, filter_structures=False)
+
+        self.assertGreater(len(out_isomorphic), len(out))
+        for mol1 in out_isomorphic:
+            self.assertTrue(any(mol1.is_isomorphic(mol2) for mol2 in out))
+
+    def test_isomorphism_key(self):
+        """Test that the isomorphism key matches for isomorphic structures and distinguishes others."""
+        mol = Molecule(smiles='C=C[CH]C=CC')
+        mol_list = generate_resonance_structures(mol, keep_isomorphic=True, filter_structures=False)
+        for mol1 in mol_list:
+            for mol2 in mol_list:
+                if mol1.is_isomorphic(mol2):
+                    self.assertEqual(_get_isomorphism_key(mol1), _get_isomorphism_key(mol2))
+        # Isomers with different bond orders have different keys
+        self.assertNotEqual(_get_isomorphism_key(Molecule(smiles='C=CC=C')),
+                            _get_isomorphism_key(Molecule(smiles='C#CCC')))
+
+    def test_optimal_aromatic_structures_of_non_aromatic(self):
+        """Test that no aromatic structures are generated for a cyclic species without aromatic rings."""
+        self.assertEqual(generate_optimal_aromatic_resonance_structures(Molecule(smiles='C1=CCCCC1')), [])
+
+    def test_skip_known_structures(self):
+        """Test that structures isomorphic to known structures are not generated."""
+        mol = Molecule(smiles='[CH2]C=C')
+        self.assertEqual(len(generate_allyl_delocalization_resonance_structures(mol)), 1)
+        # The parent structure itself is not used to skip new structures
+        buckets = {_get_isomorphism_key(mol): [mol]}
+        self.assertEqual(len(generate_allyl_delocalization_resonance_structures(mol, buckets)), 1)
+        known = Molecule(smiles='C=C[CH2]')
+        buckets = {_get_isomorphism_key(known): [known]}
+        self.assertEqual(generate_allyl_delocalization_resonance_structures(mol, buckets), [])
+
+    def test_isomorphic_resonance_structures(self):
+        """Test that isomorphic resonance structures are found without changing the atom order of the isomers."""
+        mol = Molecule(smiles='[CH2]C=C')
+        atoms = mol.atoms[:]
+        isomers = generate_isomorphic_resonance_structures(mol)
+        self.assertEqual(len(isomers), 2)
+        self.assertIs(isomers[0], mol)
+        self.assertEqual(mol.atoms, atoms)
+        self.assertTrue(isomers[1].is_isomorphic(mol))
+
+        # Hydrogen atoms are added for the search and removed again, as done for InChI generation
+        mol = Molecule(smiles='[CH2]C=C')
+        mol.delete_hydrogens()
+        atoms = mol.atoms[:]
+        atomtypes = [atom.atomtype for atom in atoms]
+        isomers = generate_isomorphic_resonance_structures(mol, saturate_h=True)
+        self.assertEqual(len(isomers), 2)
+        self.assertEqual(mol.atoms, atoms)
+        self.assertEqual([atom.atomtype for atom in mol.atoms], atomtypes)
+        for isomer in isomers:
+            self.assertEqual(len(isomer.atoms), 3)
+
+    def test_generate_with_other_methods(self):
+        """Test that methods which do not skip known structures are called with the molecule only."""
+        mol = Molecule(smiles='C=C[CH]C=CC')
+        calls = []
+
+        def method(molecule):
+            calls.append(molecule)
+            return []
+
+        mol_list = _generate_resonance_structures([mol], [method, generate_allyl_delocalization_resonance_structures])
+        self.assertEqual(len(mol_list), 3)
+        self.assertEqual(len(calls), 3)
+
+    def test_copy_resonance_structure(self):
+        """Test that resonance structures are only copied if the changed atoms have valid atom types."""
+        mol = Molecule(smiles='C=C')
+        atom1, atom2 = [atom for atom in mol.atoms if atom.is_carbon()]
+        bond = mol.get_bond(atom1, atom2)
+        bond.decrement_order()
+        atom1.increment_radical()
+        atom2.increment_radical()
+        structure = _copy_resonance_structure(mol, [atom1, atom2])
+        self.assertEqual([atom.atomtype.label for atom in structure.atoms if atom.is_carbon()], ['Cs', 'Cs'])
+        self.assertEqual([atom1.atomtype.label, atom2.atomtype.label], ['Cd', 'Cd'])
+
+        bond.increment_order()
+        bond.increment_order()
+        atom1.decrement_radical()
+        atom2.decrement_radical()
+        self.assertIsNone(_copy_resonance_structure(mol, [atom1, atom2]))
+
+    def test_radical_methods_only_for_radicals(self):
+        """Test that methods which only shift radicals are not used for closed shell species."""
+        method_list = populate_resonance_algorithms(analyze_molecule(Molecule(smiles='[N-]=[N+]=O')))
+        self.assertIn(generate_adj_lone_pair_multiple_bond_resonance_structures, method_list)
+        self.assertNotIn(generate_adj_lone_pair_radical_resonance_structures, method_list)
+
+        method_list = populate_resonance_algorithms(analyze_molecule(Molecule(smiles='[O]N=O')))
+        self.assertIn(generate_adj_lone_pair_multiple_bond_resonance_structures, method_list)
+        self.assertIn(generate_adj_lone_pair_radical_resonance_structures, method_list)
+
     def test_false_negative_aromaticity_perception(self):
         """Test that we obtain the correct aromatic structure for a monocyclic aromatic that RDKit mis-identifies."""
         mol = Molecule(smiles='[CH2]C=C1C=CC(=C)C=C1')
@@ -1232,6 +1349,37 @@ class ClarTest(unittest.TestCase):
 
         self.assertTrue(mol.is_aromatic())
 
+    def test_clar_transformation_only_changes_ring(self):
+        """Test that clarTransformation only converts the bonds of the given ring."""
+        mol = Molecule().from_smiles('C1=CC=C2C=CC=CC2=C1')  # Naphthalene
+        ring1, ring2 = mol.get_smallest_set_of_smallest_rings()
+        _clar_transformation(mol, ring1)
+
+        for bond in mol.get_all_edges():
+            if bond.atom1 in ring1 and bond.atom2 in ring1:
+                self.assertTrue(bond.is_benzene())
+            else:
+                self.assertFalse(bond.is_benzene())
+
+    def test_clar_connectivity_matrix(self):
+        """Test that the connectivity matrix marks the rings and bonds each atom is in"""
+        mol = Molecule().from_smiles('Cc1cccc2ccccc12')  # 1-Methylnaphthalene
+        rings = mol.get_smallest_set_of_smallest_rings()
+        atoms = [atom for atom in mol.atoms if any([atom in ring for ring in rings])]
+        bonds = [bond for bond in mol.get_all_edges() if (bond.atom1 in atoms or bond.atom2 in atoms)
+                 and bond.atom1.is_non_hydrogen() and bond.atom2.is_non_hydrogen()]
+        a = _get_clar_connectivity_matrix(atoms, rings, bonds)
+
+        self.assertEqual(a.shape, (10, 2 + 12))
+        # Each ring has 6 atoms, each ring bond has 2, and the bond to the methyl group has 1
+        self.assertEqual(a.sum(axis=0).tolist(), [6, 6] + [2 if bond.atom1 in atoms and bond.atom2 in atoms else 1
+                                                           for bond in bonds])
+        for i, atom in enumerate(atoms):
+            for j, ring in enumerate(rings):
+                self.assertEqual(a[i, j], 1 if atom in ring else 0)
+            for j, bond in enumerate(bonds):
+                self.assertEqual(a[i, 2 + j], 1 if atom in (bond.atom1, bond.atom2) else 0)
+
     def test_clar_optimization(self):
         """Test to ensure pi electrons are conserved during optimization"""
         mol = Molecule().from_smiles('C1=CC=C2C=CC=CC2=C1')  # Naphthalene
@@ -1257,6 +1405,34 @@ class ClarTest(unittest.TestCase):
             # Check that we only assign 1 aromatic sextet
             self.assertEqual(sum(y), 1)
 
+    def test_clar_optimization_solutions(self):
+        """Test that each optimal solution is found once, with rings and bonds belonging to its own molecule"""
+        mol = Molecule().from_smiles('C1=CC=C2C=CC=CC2=C1')  # Naphthalene
+        output = _clar_optimization(mol)
+
+        self.assertEqual(len(output), 2)
+        self.assertNotEqual(output[0][3][0:2], output[1][3][0:2])
+        self.assertIsNot(output[0][0], output[1][0])
+        for molecule, asssr, bonds, solution in output:
+            self.assertIsNot(molecule, mol)
+            for ring in asssr:
+                for atom in ring:
+                    self.assertIn(atom, molecule.atoms)
+                    self.assertNotIn(atom, mol.atoms)
+            for bond in bonds:
+                self.assertIs(molecule.get_bond(bond.atom1, bond.atom2), bond)
+
+    def test_clar_optimization_single_ring(self):
+        """Test that a single aromatic ring gets a sextet, with all bonds single"""
+        mol = Molecule().from_smiles('Cc1ccccc1')  # Toluene
+        output = _clar_optimization(mol)
+
+        self.assertEqual(len(output), 1)
+        molecule, asssr, bonds, solution = output[0]
+        self.assertEqual(len(asssr), 1)
+        self.assertEqual(len(bonds), 7)
+        self.assertEqual(solution, [1] + [0] * 7)
+
     def test_phenanthrene(self):
         """Test that we generate 1 Clar structure for phenanthrene."""
         mol = Molecule().from_smiles('C1=CC=C2C(C=CC3=CC=CC=C32)=C1')
@@ -1426,3 +1602,45 @@ class ClarTest(unittest.TestCase):
         """
         mol_list = generate_resonance_structures(Molecule(smiles="S1SSS1"), filter_structures=False)
         self.assertEqual(len(mol_list), 10)
+
+
+@unittest.skipIf(NO_LPSOLVE, "lpsolve55 is not installed.")
+class ClarLpsolveTest(ClarTest):
+    """
+    Runs the Clar structure tests using lpsolve, which is otherwise only used if scipy.optimize.milp is not available.
+    """
+
+    def setUp(self):
+        """
+        A function run before each unit test in this class.
+        """
+        patcher = mock.patch('rmgpy.molecule.resonance.milp', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class ClarMilpTest(unittest.TestCase):
+    """
+    Contains unit tests for solving Clar structure problems using scipy.optimize.milp.
+    """
+
+    @unittest.skipIf(NO_MILP, "scipy.optimize.milp is only available in SciPy 1.9 or later.")
+    def test_solve_clar_milp(self):
+        """Test that the milp solver finds a sextet, and respects additional constraints"""
+        mol = Molecule().from_smiles('C1=CC=C2C=CC=CC2=C1')  # Naphthalene
+        rings = mol.get_smallest_set_of_smallest_rings()
+        atoms = [atom for atom in mol.atoms if atom.is_carbon()]
+        bonds = [bond for bond in mol.get_all_edges() if bond.atom1.is_carbon() and bond.atom2.is_carbon()]
+        a = _get_clar_connectivity_matrix(atoms, rings, bonds)
+        exo = [None] * len(bonds)
+
+        status, obj_val, solution = _solve_clar_milp(a, exo, [])
+        self.assertEqual(status, 0)
+        self.assertAlmostEqual(obj_val, 1)
+
+        # Exclude the sextet that was found, so that the other ring gets it
+        y = [int(round(value)) for value in solution[0:2]]
+        status, obj_val, solution2 = _solve_clar_milp(a, exo, [(y + [0] * len(bonds), sum(y) - 1)])
+        self.assertEqual(status, 0)
+        self.assertAlmostEqual(obj_val, 1)
+        self.assertEqual([int(round(value)) for value in solution2[0:2]], [1 - value for value in y])